@@ -1,21 +1,26 @@
 import logging
 import sys
+from functools import lru_cache
 import requests
-from config import PROM_API_TOKENS, PROM_API_HOST
+from config import PROM_API_TOKENS, PROM_API_HOST, REQUEST_TIMEOUT, get_session
+from utils import extract_note
 
 logging.basicConfig(level=logging.INFO, stream=sys.stdout)
 
+@lru_cache(maxsize=4096)
+def _get_product(product_id):
+    url = f"{PROM_API_HOST}/products/{product_id}"
+    params = {"include_private_notes": 1}
+    session = get_session(PROM_API_TOKENS[0])
+    resp = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json().get("product", {})
+
 def get_product_data(product_id):
     if not PROM_API_TOKENS:
         return None
-    token = PROM_API_TOKENS[0]
-    headers = {"Authorization": f"Bearer {token}"}
-    url = f"{PROM_API_HOST}/products/{product_id}"
-    params = {"include_private_notes": 1}
     try:
-        resp = requests.get(url, headers=headers, params=params)
-        if resp.status_code == 200:
-            return resp.json().get("product", {})
+        return _get_product(product_id)
     except Exception as e:
         print(f"Error fetching {product_id}: {e}")
     return None
@@ -33,7 +38,7 @@ def check_product_note(product_id):
     print(f"Тип: {'Вариация' if data.get('is_variation') else 'Основной товар'}")
     
     # Check notes
-    note = data.get("private_note") or data.get("personal_notes")
+    note = extract_note(data)
     if note:
         print(f"✅ НАЙДЕНА Личная заметка: '{note}'")
     else:
@@ -48,28 +53,23 @@ def check_product_note(product_id):
     else:
         print("❌ Изображения не найдены.")
 
-    # Check parent if variation
-        parent_id = data.get("variation_base_id")
-        if parent_id:
-            print(f"\n🔎 Это вариация. Проверяем родительский товар (ID: {parent_id})...")
-            try:
-                token = PROM_API_TOKENS[0]
-                headers = {"Authorization": f"Bearer {token}"}
-                params = {"include_private_notes": 1}
-                url_parent = f"{PROM_API_HOST}/products/{parent_id}"
-                resp_parent = requests.get(url_parent, headers=headers, params=params)
-                if resp_parent.status_code == 200:
-                    parent_data = resp_parent.json().get("product", {})
-                    p_note = parent_data.get("private_note") or parent_data.get("personal_notes")
-                    if p_note:
-                        print(f"✅ НАЙДЕНА заметка в родительском товаре: '{p_note}'")
-                    else:
-                        print("❌ В родительском товаре заметки тоже нет.")
-                else:
-                    print(f"Ошибка получения родителя: {resp_parent.status_code}")
-            except Exception as e:
-                print(f"Ошибка проверки родителя: {e}")
-        
+    # Check parent only for variations whose own note is missing
+    parent_id = data.get("variation_base_id")
+    if not note and parent_id:
+        print(f"\n🔎 Это вариация. Проверяем родительский товар (ID: {parent_id})...")
+        try:
+            parent_data = _get_product(parent_id)
+            p_note = extract_note(parent_data)
+            if p_note:
+                print(f"✅ НАЙДЕНА заметка в родительском товаре: '{p_note}'")
+            else:
+                print("❌ В родительском товаре заметки тоже нет.")
+        except requests.exceptions.HTTPError as e:
+            print(f"Ошибка получения родителя: {e.response.status_code}")
+        except Exception as e:
+            print(f"Ошибка проверки родителя: {e}")
+
+    if not note:
         print("\nУбедитесь, что вы заполнили поле 'Личная заметка' в карточке товара.")
 
 if __name__ == "__main__":
@@ -1,11 +1,41 @@
 import os
+import functools
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Support multiple tokens separated by comma or new lines
 PROM_API_TOKENS = [t.strip() for t in os.getenv("PROM_API_TOKEN", "").split(",") if t.strip()]
+# Ready-to-use auth headers keyed by token (built once at import, shared by every client)
+PROM_AUTH_HEADERS = {t: {"Authorization": f"Bearer {t}"} for t in PROM_API_TOKENS}
+PROM_DEFAULT_HEADERS = PROM_AUTH_HEADERS[PROM_API_TOKENS[0]] if PROM_API_TOKENS else {}
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 PROM_API_HOST = "https://my.prom.ua/api/v1"
+
+USER_AGENT = "prom-order-manager"
+# (connect, read) seconds; pass to every request so a stuck socket can't hang a script
+REQUEST_TIMEOUT = (3, 10)
+
+@functools.lru_cache(maxsize=None)
+def get_session(token=None):
+    """
+    Shared keep-alive session with retry/backoff, one per token.
+    With a token the Prom.ua Authorization header is set by default;
+    without one the session is anonymous (e.g. for the Telegram API).
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3, connect=3, read=2, backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+    )
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retries))
+    session.headers.update({"User-Agent": USER_AGENT})
+    if token:
+        session.headers.update(PROM_AUTH_HEADERS[token])
+    return session
@@ -1,63 +1,113 @@
+import io
 import logging
-import json
-import requests
-from config import PROM_API_TOKENS, PROM_API_HOST
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from config import PROM_API_TOKENS, PROM_API_HOST, REQUEST_TIMEOUT, get_session
+from utils import extract_note
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+def _json(resp):
+    # Parse straight from the raw bytes, skipping the text decode step
+    return _loads(resp.content)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MAX_WORKERS = 16
+
+@lru_cache(maxsize=4096)
+def _get_product(product_id):
+    """
+    Fetch a product once per run; repeated SKUs/parents are served from memory.
+    Failures raise and are therefore not cached.
+    """
+    session = get_session(PROM_API_TOKENS[0])
+    resp = session.get(f"{PROM_API_HOST}/products/{product_id}", timeout=REQUEST_TIMEOUT)
+    resp.raise_for_status()
+    return _json(resp).get("product", {})
+
+def _fetch_wave(executor, product_ids):
+    """
+    Fetch all IDs as one parallel wave and wait for it. Returns {product_id: Future}.
+    Prom API has no multi-id product endpoint, so a wave is a set of parallel GETs.
+    """
+    futures = {pid: executor.submit(_get_product, pid) for pid in product_ids}
+    wait(futures.values())
+    return futures
+
 def main():
     if not PROM_API_TOKENS:
         print("No tokens found.")
         return
 
-    token = PROM_API_TOKENS[0]
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-
     # 1. Fetch recent orders (ANY status)
     print("--- Fetching recent orders (limit 5) ---")
     url = f"{PROM_API_HOST}/orders/list"
     try:
         # Just get list, usually returns recent first
-        response = requests.get(url, headers=headers, params={"limit": 5})
+        session = get_session(PROM_API_TOKENS[0])
+        response = session.get(url, params={"limit": 5}, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        orders = response.json().get("orders", [])
-        
+        orders = _json(response).get("orders", [])
+
+        # 2. Collect unique product IDs across all orders (shared SKUs are fetched once)
+        product_ids = {item['id'] for order in orders for item in order.get("products", [])}
+
+        # 3. Fetch all products in one parallel wave, then the parents of note-less variations
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            products = _fetch_wave(executor, product_ids)
+            parent_ids = {
+                future.result()["variation_base_id"]
+                for future in products.values()
+                if not future.exception()
+                and future.result().get("variation_base_id")
+                and not extract_note(future.result())
+            }
+            parents = _fetch_wave(executor, parent_ids)
+
+        # 4. Render from the completed futures only, no network below this point
+        buf = io.StringIO()
         for order in orders:
-            print(f"Order ID: {order['id']} | Status: {order['status']} | Date: {order['date_created']}")
+            print(f"Order ID: {order['id']} | Status: {order['status']} | Date: {order['date_created']}", file=buf)
             for item in order.get("products", []):
-                print(f"  - Product: {item['name']} (SKU: {item['sku']}, ID: {item['id']})")
-                
-                # Check product details immediately
-                p_url = f"{PROM_API_HOST}/products/{item['id']}"
-                p_res = requests.get(p_url, headers=headers)
-                if p_res.status_code == 200:
-                    p_data = p_res.json().get("product", {})
-                    note = p_data.get("private_note") or p_data.get("personal_notes") or "None"
-                    print(f"    -> Product Private Note: '{note}'")
-                    
+                print(f"  - Product: {item['name']} (SKU: {item['sku']}, ID: {item['id']})", file=buf)
+
+                p_future = products[item['id']]
+                if p_future.exception():
+                    print(f"    -> Fetch failed: {p_future.exception()}", file=buf)
+                else:
+                    p_data = p_future.result()
+                    note = extract_note(p_data)
+                    print(f"    -> Product Private Note: '{note or 'None'}'", file=buf)
+
                     # If empty, check parent
-                    if not note or note == "None":
+                    if not note:
                         parent_id = p_data.get("variation_base_id")
                         if parent_id:
-                            print(f"    -> Checking Parent {parent_id}...")
-                            parent_res = requests.get(f"{PROM_API_HOST}/products/{parent_id}", headers=headers)
-                            if parent_res.status_code == 200:
-                                parent_data = parent_res.json().get("product", {})
-                                p_note = parent_data.get("private_note") or parent_data.get("personal_notes") or "None"
-                                print(f"    -> Parent Private Note: '{p_note}'")
+                            print(f"    -> Checking Parent {parent_id}...", file=buf)
+                            parent_future = parents[parent_id]
+                            if parent_future.exception():
+                                print(f"    -> Parent fetch failed: {parent_future.exception()}", file=buf)
                             else:
-                                print(f"    -> Parent fetch failed: {parent_res.status_code}")
+                                p_note = extract_note(parent_future.result()) or "None"
+                                print(f"    -> Parent Private Note: '{p_note}'", file=buf)
                         else:
-                            print("    -> No parent (not a variation or base)")
-                else:
-                    print(f"    -> Fetch failed: {p_res.status_code}")
+                            print("    -> No parent (not a variation or base)", file=buf)
+
+            print("-" * 30, file=buf)
 
-            print("-" * 30)
+            # One write per order instead of one per line
+            sys.stdout.write(buf.getvalue())
+            buf.seek(0)
+            buf.truncate(0)
 
     except Exception as e:
         print(f"Error: {e}")
@@ -1,6 +1,7 @@
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from config import REQUEST_TIMEOUT, get_session
 
 def get_chat_id():
     load_dotenv()
@@ -11,11 +12,20 @@ def get_chat_id():
         return
 
     print(f"Используем токен: {token[:5]}...{token[-5:]}")
+    session = get_session()
+
+    # getMe and getUpdates are independent, so both requests run at once
+    me_url = f"https://api.telegram.org/bot{token}/getMe"
+    url = f"https://api.telegram.org/bot{token}/getUpdates"
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_me = ex.submit(session.get, me_url, timeout=REQUEST_TIMEOUT)
+        # Telegram returns at most 100 updates per call by default, so the body
+        # stays small enough to parse in one go.
+        f_up = ex.submit(session.get, url, timeout=REQUEST_TIMEOUT)
     
     # Check Bot Identity
     try:
-        me_url = f"https://api.telegram.org/bot{token}/getMe"
-        me_response = requests.get(me_url)
+        me_response = f_me.result()
         me_data = me_response.json()
         if me_data.get("ok"):
             bot_username = me_data["result"]["username"]
@@ -28,8 +38,7 @@ def get_chat_id():
     print("Попытка получить обновления...")
     
     try:
-        url = f"https://api.telegram.org/bot{token}/getUpdates"
-        response = requests.get(url)
+        response = f_up.result()
         data = response.json()
         
         if not data.get("ok"):
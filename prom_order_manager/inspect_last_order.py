@@ -1,42 +1,84 @@
+import asyncio
 import logging
 import json
 import sys
-from config import PROM_API_TOKENS
-from prom_client import PromClient
+from operator import itemgetter
+import httpx
+from config import PROM_API_TOKENS, PROM_API_HOST, PROM_DEFAULT_HEADERS
+from utils import NOTE_PREFIXES, TTN_KEYS, extract_note
 
-# Configure logging
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False)
+
+# Configure logging (pass --verbose to dump full product payloads)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+if "--verbose" in sys.argv:
+    # Only this module: httpx/httpcore/h2 debug output would bury the payload dump
+    logger.setLevel(logging.DEBUG)
 
 def _parse_private_note(note):
     data = {}
     if not note:
         return data
         
-    parts = [p.strip() for p in note.split("|")]
-    for part in parts:
-        part_lower = part.lower()
-        if part_lower.startswith("price:") or part_lower.startswith("цена:"):
-            data["purchase_price"] = part.split(":", 1)[1].strip()
-        elif part_lower.startswith("supplier:") or part_lower.startswith("поставщик:"):
-            data["supplier"] = part.split(":", 1)[1].strip()
-        elif part_lower.startswith("art:") or part_lower.startswith("арт:"):
-            data["model"] = part.split(":", 1)[1].strip()
+    for part in note.split("|"):
+        key, sep, val = part.partition(":")
+        if not sep:
+            continue
+        field = NOTE_PREFIXES.get(key.strip().lower())
+        if field:
+            data[field] = val.strip()
     return data
 
-def main():
+async def _fetch_json(session, url, params=None):
+    try:
+        response = await session.get(url, params=params)
+        response.raise_for_status()
+        return response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"Error fetching {url}: {e}")
+        return {}
+
+async def _get_products(session, product_ids):
+    """
+    Fetch several products concurrently. Returns {product_id: product_data or None}.
+    """
+    results = await asyncio.gather(
+        *[_fetch_json(session, f"{PROM_API_HOST}/products/{pid}") for pid in product_ids]
+    )
+    return {pid: data.get("product") for pid, data in zip(product_ids, results)}
+
+async def main():
     if not PROM_API_TOKENS:
         print("No tokens found.")
         return
 
-    client = PromClient(PROM_API_TOKENS[0])
-    
+    # HTTP/2 multiplexes the concurrent product fetches over a single connection
+    async with httpx.AsyncClient(
+        http2=True,
+        headers=PROM_DEFAULT_HEADERS,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+        timeout=httpx.Timeout(10.0, connect=3.0),
+    ) as session:
+        await _inspect(session)
+
+async def _inspect(session):
     # Try different statuses to find the latest order
     statuses = ["pending", "received", "processing"]
     all_orders = []
-    
-    for status in statuses:
-        orders = client.get_orders(status=status)
+
+    orders_per_status = await asyncio.gather(
+        *[_fetch_json(session, f"{PROM_API_HOST}/orders/list", {"status": s}) for s in statuses]
+    )
+    for status, data in zip(statuses, orders_per_status):
+        orders = data.get("orders", [])
         if orders:
             print(f"Found {len(orders)} orders with status '{status}'")
             all_orders.extend(orders)
@@ -45,9 +87,8 @@ def main():
         print("No orders found.")
         return
 
-    # Sort by ID descending to get the newest
-    all_orders.sort(key=lambda x: x.get("id"), reverse=True)
-    latest_order = all_orders[0]
+    # Highest ID is the newest
+    latest_order = max(all_orders, key=itemgetter("id"))
     
     order_id = latest_order.get("id")
     print(f"\n--- Latest Order ID: {order_id} ---")
@@ -55,28 +96,34 @@ def main():
     print(f"Client: {latest_order.get('client_first_name')} {latest_order.get('client_last_name')}")
     
     delivery_data = latest_order.get("delivery_provider_data", {})
-    ttn = None
-    for key in ["declaration_number", "ttn", "invoice_number"]:
-        if val := delivery_data.get(key):
-            ttn = val
-            break
+    ttn = next((v for k in TTN_KEYS if (v := delivery_data.get(k))), None)
     print(f"TTN: {ttn if ttn else 'NOT FOUND (Message requires TTN)'}")
 
-    for item in latest_order.get("products", []):
+    # Fetch all products of the order, then the parents of note-less variations
+    items = latest_order.get("products", [])
+    products = await _get_products(session, list({item.get("id") for item in items}))
+    parent_ids = {
+        p.get("variation_base_id")
+        for p in products.values()
+        if p and not extract_note(p) and p.get("variation_base_id")
+    }
+    parents = await _get_products(session, list(parent_ids))
+
+    for item in items:
         product_id = item.get("id")
         name = item.get("name")
         print(f"\nProcessing Product: {name} (ID: {product_id})")
         
-        product_data = client.get_product(product_id)
+        product_data = products.get(product_id)
         private_note = ""
         if product_data:
-            private_note = product_data.get("private_note") or product_data.get("personal_notes") or ""
+            private_note = extract_note(product_data)
             if not private_note and product_data.get("variation_base_id"):
                  parent_id = product_data.get("variation_base_id")
                  print(f"Checking parent {parent_id}...")
-                 parent_data = client.get_product(parent_id)
+                 parent_data = parents.get(parent_id)
                  if parent_data:
-                     private_note = parent_data.get("private_note") or parent_data.get("personal_notes") or ""
+                     private_note = extract_note(parent_data)
 
         print(f"Raw Private Note: '{private_note}'")
         
@@ -85,7 +132,8 @@ def main():
         if product_data:
             print(f"private_note field: '{product_data.get('private_note')}'")
             print(f"personal_notes field: '{product_data.get('personal_notes')}'")
-            print(json.dumps(product_data, indent=2, ensure_ascii=False))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s", _dumps(product_data))
         
         parsed = _parse_private_note(private_note)
         print("Parsed Data:")
@@ -97,4 +145,4 @@ def main():
             print("❌ Supplier NOT found in note.")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -1,14 +1,17 @@
 import time
 import logging
-import json
+import orjson
 import os
 import asyncio
 import re
 import threading
+import httpx
 from flask import Flask
-import pandas as pd
+from openpyxl import load_workbook
 from telegram import Bot
+from telegram.request import HTTPXRequest
 from config import PROM_API_TOKENS, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from utils import NOTE_PREFIXES, TTN_KEYS, extract_note
 from prom_client import PromClient
 
 # Configure logging
@@ -43,7 +46,9 @@ def upload_db():
         # which is what _get_json_db_path returns for server env
         
         save_path = "prom_import_data.json"
-        file.save(save_path)
+        # Save beside the target and swap atomically so a concurrent reload never reads a partial file
+        file.save(save_path + ".part")
+        os.replace(save_path + ".part", save_path)
         logger.info(f"Received DB update via HTTP. Saved to {save_path}")
         
         # We also need to tell the processor to reload.
@@ -78,17 +83,41 @@ def run_web_server():
 
 # Constants
 CHECK_INTERVAL = 30  # Check every 30 seconds (faster response)
-PROCESSED_ORDERS_FILE = "processed_orders.json"
-TARGET_STATUSES = ["received", "processing", "custom-133340"]  # Added custom "In Work" status
+ACCEPT_INTERVAL = 60  # Auto-accept pending orders every minute
+TELEGRAM_POLL_TIMEOUT = 25  # Long-poll window for get_updates
+TELEGRAM_POOL_SIZE = 2  # One connection for notifications, one for command replies and file downloads
+PROCESSED_ORDERS_FILE = "processed_orders.log"  # append-only, one order ID per line
+LEGACY_PROCESSED_ORDERS_FILE = "processed_orders.json"
+IN_WORK_STATUS = "custom-133340"  # Custom "In Work" status
+TARGET_STATUSES = ["received", "processing", IN_WORK_STATUS]
 AUTO_ACCEPT_NEW = True
 
 class OrderProcessor:
     def __init__(self):
-        self.prom_clients = [PromClient(token) for token in PROM_API_TOKENS]
+        # One pooled HTTP client shared by every shop; closed when run() exits.
+        # The transport retries failed connects; 5xx answers are retried by the next poll cycle.
+        self.http = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(
+                http2=True, limits=httpx.Limits(max_connections=50), retries=3
+            ),
+            timeout=httpx.Timeout(15.0, connect=5.0),
+        )
+        self.prom_clients = [PromClient(token, self.http) for token in PROM_API_TOKENS]
         logger.info(f"Loaded {len(self.prom_clients)} Prom.ua shops/tokens.")
         
-        self.bot = Bot(token=TELEGRAM_BOT_TOKEN)
+        # PTB's default request pool holds a single connection, which notifications would
+        # share with command replies and file downloads from the update loop
+        self.bot = Bot(
+            token=TELEGRAM_BOT_TOKEN,
+            request=HTTPXRequest(connection_pool_size=TELEGRAM_POOL_SIZE)
+        )
+        # Held for an order's whole send loop, so concurrent orders don't interleave in the chat
+        self._send_lock = asyncio.Lock()
+        self._json_db_path = None
         self.processed_orders = self._load_processed_orders()
+        # Compact once per start: drops duplicate lines and migrates the legacy JSON file
+        self._proc_fp = None
+        self._compact_processed_orders()
         self.local_notes = self._load_local_notes()
         self.last_update_id = 0 # For Telegram polling
         self.startup_mode = True # Flag to silent first run
@@ -96,11 +125,28 @@ class OrderProcessor:
         if not self.prom_clients:
             logger.warning("No Prom API tokens found! Please check .env file.")
 
-        # Initialize: mark all currently valid orders as processed to avoid spamming old ones
-        # Only do this if we have no history (first run)
-        if not self.processed_orders:
-            logger.info("First run detected. Marking existing orders as processed to avoid spam.")
-            self._mark_current_orders_processed()
+    @property
+    def local_notes(self):
+        return self._local_notes
+
+    @local_notes.setter
+    def local_notes(self, notes):
+        # Every reload (startup, Telegram upload, /upload_db) rebuilds the fuzzy-match index
+        self._local_notes = notes
+        self._notes_by_base = self._index_notes_by_base(notes)
+
+    @staticmethod
+    def _index_notes_by_base(notes):
+        """
+        Map base SKU -> (sku, note) of the first sibling variation,
+        e.g. "MIN-123-1" is indexed under "MIN-123" (and under itself).
+        """
+        index = {}
+        for sku, note in notes.items():
+            index.setdefault(sku, (sku, note))
+            if "-" in sku:
+                index.setdefault(sku.rsplit("-", 1)[0], (sku, note))
+        return index
 
     def _get_json_db_path(self):
         """
@@ -109,7 +155,13 @@ class OrderProcessor:
         1. Environment Variable SHARED_DATA_PATH
         2. Sibling directory (../prom_automation/...) - for local dev
         3. Current directory - for server deployment
+        The result is resolved once and cached for the process lifetime.
         """
+        if self._json_db_path is None:
+            self._json_db_path = self._resolve_json_db_path()
+        return self._json_db_path
+
+    def _resolve_json_db_path(self):
         env_path = os.getenv("SHARED_DATA_PATH")
         if env_path:
             return env_path
@@ -138,8 +190,8 @@ class OrderProcessor:
         if os.path.exists(json_path):
             try:
                 logger.info(f"Loading fallback notes from JSON: {json_path}")
-                with open(json_path, "r", encoding="utf-8") as f:
-                    notes = json.load(f)
+                with open(json_path, "rb") as f:
+                    notes = orjson.loads(f.read())
                 logger.info(f"Loaded {len(notes)} notes from JSON.")
                 return notes
             except Exception as e:
@@ -152,13 +204,27 @@ class OrderProcessor:
         if os.path.exists(file_path):
             try:
                 logger.info(f"Loading fallback notes from Excel: {file_path}")
-                df = pd.read_excel(file_path)
-                if 'Код_товару' in df.columns and 'Личные_заметки' in df.columns:
-                    for _, row in df.iterrows():
-                        sku = str(row['Код_товару']).strip()
-                        note = str(row['Личные_заметки'])
-                        if sku and note and note.lower() != 'nan':
-                            notes[sku] = note
+                # Stream rows read-only instead of materializing the sheet with pandas
+                wb = load_workbook(file_path, read_only=True, data_only=True)
+                try:
+                    # First sheet, as pd.read_excel did; wb.active is whichever tab was selected on save
+                    rows = wb.worksheets[0].iter_rows(values_only=True)
+                    header = list(next(rows, ()))
+                    if 'Код_товару' in header and 'Личные_заметки' in header:
+                        sku_col = header.index('Код_товару')
+                        note_col = header.index('Личные_заметки')
+                        for row in rows:
+                            # Read-only rows stop at the last non-empty cell, so they can be short
+                            if len(row) <= max(sku_col, note_col):
+                                continue
+                            if row[sku_col] is None or row[note_col] is None:
+                                continue
+                            sku = str(row[sku_col]).strip()
+                            note = str(row[note_col])
+                            if sku and note:
+                                notes[sku] = note
+                finally:
+                    wb.close()
                 logger.info(f"Loaded {len(notes)} notes from Excel.")
             except Exception as e:
                 logger.error(f"Failed to load local Excel notes: {e}")
@@ -167,49 +233,86 @@ class OrderProcessor:
             
         return notes
 
-    def _mark_current_orders_processed(self):
-        for client in self.prom_clients:
-            try:
-                for status in TARGET_STATUSES:
-                    # Fetch multiple pages if needed, but usually last 100 is enough to cover active ones
-                    # Prom API defaults are tricky, let's just rely on default page size
-                    orders = client.get_orders(status=status)
-                    if orders:
-                        for order in orders:
-                            self.processed_orders.add(str(order.get("id")))
-                    else:
-                         # logger.info(f"No existing orders found for status {status}") # Reduce log spam
-                         pass
-            except Exception as e:
-                logger.error(f"Error initializing processed orders: {e}")
+    async def _fetch_orders(self, status_list, changed_only=False):
+        """
+        Fetch orders for every shop x status concurrently.
+        Returns a list of (client, orders) pairs; failed requests are logged and skipped,
+        as are lists unchanged since the last cycle when changed_only is set.
+        """
+        pairs = [(client, status) for client in self.prom_clients for status in status_list]
+        results = await asyncio.gather(
+            *[client.get_orders(status=status, changed_only=changed_only) for client, status in pairs],
+            return_exceptions=True
+        )
+        fetched = []
+        for (client, status), orders in zip(pairs, results):
+            if isinstance(orders, Exception):
+                logger.error(f"Error fetching '{status}' orders for a client: {orders}")
+                continue
+            if orders is None:
+                continue
+            fetched.append((client, orders))
+        return fetched
+
+    async def _mark_current_orders_processed(self):
+        # Fetch multiple pages if needed, but usually last 100 is enough to cover active ones
+        # Prom API defaults are tricky, let's just rely on default page size
+        for _, orders in await self._fetch_orders(TARGET_STATUSES):
+            for order in orders:
+                self.processed_orders.add(int(order.get("id")))
         
-        # Save to file immediately
-        with open(PROCESSED_ORDERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(list(self.processed_orders), f)
+        # Save to file immediately (full rewrite, so off the event loop)
+        await asyncio.to_thread(self._compact_processed_orders)
         logger.info(f"Marked {len(self.processed_orders)} existing orders as processed.")
 
     def _load_processed_orders(self):
         if os.path.exists(PROCESSED_ORDERS_FILE):
+            processed = set()
+            with open(PROCESSED_ORDERS_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        processed.add(int(line))
+                    except ValueError:
+                        # Torn or corrupt line (e.g. crash mid-write); startup compaction drops it
+                        if line.strip():
+                            logger.warning(f"Skipping invalid line in {PROCESSED_ORDERS_FILE}: {line!r}")
+            return processed
+
+        # Migrate from the old full-rewrite JSON file
+        if os.path.exists(LEGACY_PROCESSED_ORDERS_FILE):
             try:
-                with open(PROCESSED_ORDERS_FILE, "r", encoding="utf-8") as f:
-                    return set(json.load(f))
-            except json.JSONDecodeError:
+                with open(LEGACY_PROCESSED_ORDERS_FILE, "rb") as f:
+                    return {int(order_id) for order_id in orjson.loads(f.read())}
+            except orjson.JSONDecodeError:
                 return set()
         return set()
 
+    def _compact_processed_orders(self):
+        """
+        Rewrite the log with one line per known order and reopen it for appending.
+        """
+        if self._proc_fp:
+            self._proc_fp.close()
+        tmp_path = PROCESSED_ORDERS_FILE + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{order_id}\n" for order_id in self.processed_orders)
+        os.replace(tmp_path, PROCESSED_ORDERS_FILE)
+        self._proc_fp = open(PROCESSED_ORDERS_FILE, "a", encoding="utf-8", buffering=1)
+
     def _save_processed_order(self, order_id):
-        self.processed_orders.add(str(order_id))
-        with open(PROCESSED_ORDERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(list(self.processed_orders), f)
+        order_id = int(order_id)
+        if order_id in self.processed_orders:
+            return
+        self.processed_orders.add(order_id)
+        self._proc_fp.write(f"{order_id}\n")
 
     def _extract_ttn(self, order):
         # Try to find TTN in delivery_provider_data
-        delivery_data = order.get("delivery_provider_data", {})
-        if delivery_data:
-             # Common keys: declaration_number, ttn
-            for key in ["declaration_number", "ttn", "invoice_number"]:
-                if val := delivery_data.get(key):
-                    return val
+        delivery_data = order.get("delivery_provider_data") or {}
+        # Common keys: declaration_number, ttn
+        for key in TTN_KEYS:
+            if val := delivery_data.get(key):
+                return val
         
         # Fallback: check general delivery_note or similar
         return order.get("delivery_note")
@@ -224,21 +327,18 @@ class OrderProcessor:
         if not note:
             return data
             
-        parts = [p.strip() for p in note.split("|")]
         supplier_parts = []
         
-        for part in parts:
-            part_lower = part.lower()
-            if part_lower.startswith("price:") or part_lower.startswith("цена:"):
-                data["purchase_price"] = part.split(":", 1)[1].strip()
-            elif part_lower.startswith("art:") or part_lower.startswith("арт:"):
-                data["model"] = part.split(":", 1)[1].strip()
+        for part in note.split("|"):
+            part = part.strip()
+            key, sep, val = part.partition(":")
+            field = NOTE_PREFIXES.get(key.strip().lower()) if sep else None
+            if field in ("purchase_price", "model"):
+                data[field] = val.strip()
             else:
                 # Assuming this is part of the supplier info
                 # Remove "Supplier:" prefix if present
-                clean_part = part
-                if part_lower.startswith("supplier:") or part_lower.startswith("поставщик:"):
-                    clean_part = part.split(":", 1)[1].strip()
+                clean_part = val.strip() if field == "supplier" else part
                 
                 if clean_part:
                     supplier_parts.append(clean_part)
@@ -254,41 +354,165 @@ class OrderProcessor:
         if not AUTO_ACCEPT_NEW:
             return
 
-        for client in self.prom_clients:
-            try:
-                orders = client.get_orders(status="pending")
-                for order in orders:
-                    order_id = order.get("id")
-                    logger.info(f"Auto-accepting new order {order_id}")
-                    # Step 1: Try to set 'In Work' (custom-133340) directly
-                    # If that fails (e.g. not allowed from pending), fallback to 'received'
-                    target_status = "custom-133340"
-                    if client.set_order_status(order_id, target_status):
-                        logger.info(f"Order {order_id} accepted successfully (set to '{target_status}')")
-                    else:
-                        logger.warning(f"Failed to set {target_status} directly. Falling back to 'received'...")
-                        if client.set_order_status(order_id, "received"):
-                            logger.info(f"Order {order_id} set to 'received' (fallback)")
-                        else:
-                            logger.error(f"Failed to accept order {order_id} (both targets failed)")
-            except Exception as e:
-                logger.error(f"Error auto-accepting orders: {e}")
+        tasks = [
+            self._accept_orders(client, [order.get("id") for order in orders])
+            for client, orders in await self._fetch_orders(["pending"])
+            if orders
+        ]
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Error auto-accepting orders: {result}")
+
+    async def _accept_orders(self, client, order_ids):
+        """
+        Accept all pending orders of a shop with one bulk call.
+        Orders the batch did not move are retried one by one.
+        """
+        logger.info(f"Auto-accepting new orders {order_ids}")
+        target_status = IN_WORK_STATUS
+        accepted = set(await client.set_order_status_bulk(order_ids, target_status))
+        if accepted:
+            logger.info(f"Orders {sorted(accepted)} accepted successfully (set to '{target_status}')")
+
+        remaining = [order_id for order_id in order_ids if int(order_id) not in accepted]
+        if remaining:
+            logger.warning(f"Bulk accept failed for {remaining}. Retrying orders one by one...")
+            for order_id in remaining:
+                await self._accept_order(client, order_id)
+
+    async def _accept_order(self, client, order_id):
+        logger.info(f"Auto-accepting new order {order_id}")
+        # Step 1: Try to set 'In Work' (custom-133340) directly
+        # If that fails (e.g. not allowed from pending), fallback to 'received'
+        target_status = IN_WORK_STATUS
+        if await client.set_order_status(order_id, target_status):
+            logger.info(f"Order {order_id} accepted successfully (set to '{target_status}')")
+        else:
+            logger.warning(f"Failed to set {target_status} directly. Falling back to 'received'...")
+            if await client.set_order_status(order_id, "received"):
+                logger.info(f"Order {order_id} set to 'received' (fallback)")
+            else:
+                logger.error(f"Failed to accept order {order_id} (both targets failed)")
 
     async def process_orders(self):
         logger.info("Checking for new orders...")
         
-        for client in self.prom_clients:
-            try:
-                for status in TARGET_STATUSES:
-                    orders = client.get_orders(status=status)
+        # Dedupe in case an order moved status between the concurrent fetches
+        batch = {}
+        # Unchanged order lists (same ETag/body as last cycle) have nothing new to process
+        for client, orders in await self._fetch_orders(TARGET_STATUSES, changed_only=True):
+            for order in orders:
+                batch.setdefault(order.get("id"), (client, order))
+
+        results = await asyncio.gather(
+            *[self._process_single_order(client, order) for client, order in batch.values()],
+            return_exceptions=True
+        )
+
+        # Move all notified orders to 'In Work' with one status call per shop
+        to_update = {}
+        for (client, _), result in zip(batch.values(), results):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing order: {result}")
+                # Make sure the failed order is seen again next cycle even if the list is unchanged
+                client.reset_orders_state()
+            elif result:
+                to_update.setdefault(client, []).append(result)
+
+        await asyncio.gather(*[
+            self._update_status(client, order_ids, IN_WORK_STATUS)
+            for client, order_ids in to_update.items()
+        ])
+
+    async def _update_status(self, client, order_ids, status):
+        updated = set(await client.set_order_status_bulk(order_ids, status))
+        if updated:
+            logger.info(f"Automatically updated orders {sorted(updated)} status to '{status}'")
+
+        # One order with a disallowed transition must not hold back the rest of the batch
+        for order_id in order_ids:
+            if order_id in updated:
+                continue
+            if await client.set_order_status(order_id, status):
+                logger.info(f"Automatically updated order {order_id} status to '{status}'")
+            else:
+                logger.error(f"Failed to update status for order {order_id}")
+
+    async def _fetch_item_note(self, client, item):
+        """
+        Fetch an order item's product and resolve its private note
+        (product, then parent product, then local DB by SKU).
+        Returns (product_data, private_note).
+        """
+        product_id = item.get("id")
+
+        # Fetch product to get private note using the SAME client that found the order
+        product_data = await client.get_product(product_id)
+        private_note = ""
+        if product_data:
+            private_note = extract_note(product_data)
+            
+            # If no note, check if it's a variation and try fetching parent
+            if not private_note and product_data.get("variation_base_id"):
+                parent_id = product_data.get("variation_base_id")
+                logger.info(f"Checking parent product {parent_id} for note...")
+                parent_data = await client.get_product(parent_id)
+                if parent_data:
+                    private_note = extract_note(parent_data)
+                    if private_note:
+                        logger.info(f"Found note in parent product: {private_note}")
+
+            # Fallback: Check local Excel notes by SKU
+            if not private_note:
+                sku = item.get("sku")
+                if sku:
+                    logger.info(f"Checking local notes for SKU {sku}...")
+                    private_note = self.local_notes.get(sku, "")
                     
-                    for order in orders:
-                        await self._process_single_order(client, order)
-            except Exception as e:
-                logger.error(f"Error checking orders for a client: {e}")
+                    # Fuzzy match: Try to find sibling variations if exact match fails
+                    # e.g. if we have MIN-123-4 but DB only has MIN-123-1, they share the same supplier info
+                    if not private_note and "-" in sku:
+                        base_sku = sku.rsplit("-", 1)[0] # "MIN-123-4" -> "MIN-123"
+                        logger.info(f"Direct match failed. Trying fuzzy match for base SKU: {base_sku}...")
+                        
+                        # Look up the prebuilt base-SKU index instead of scanning all keys
+                        match = self._notes_by_base.get(base_sku)
+                        if match:
+                            db_sku, private_note = match
+                            logger.info(f"Fuzzy match success! Found similar SKU {db_sku}")
+
+                    if private_note:
+                        logger.info(f"Found note in local fallback: {private_note}")
+                    else:
+                        logger.warning(f"SKU {sku} not found in local DB (loaded {len(self.local_notes)} items).")
+
+        return product_data, private_note
+
+    async def _send_notification(self, order_id, product_id, message, image_url):
+        try:
+            sent_photo = False
+            if image_url:
+                try:
+                    await self.bot.send_photo(chat_id=TELEGRAM_CHAT_ID, photo=image_url, caption=message)
+                    logger.info(f"Sent notification with photo for order {order_id}, item {product_id}")
+                    sent_photo = True
+                except Exception as e_photo:
+                    logger.warning(f"Failed to send photo for order {order_id}: {e_photo}. Falling back to text.")
+            
+            if not sent_photo:
+                    await self.bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+                    logger.info(f"Sent text notification for order {order_id}, item {product_id}")
+
+        except Exception as e:
+            logger.error(f"Failed to send Telegram message: {e}")
 
     async def _process_single_order(self, client, order):
-        order_id = str(order.get("id"))
+        """
+        Notify about a new order with TTN.
+        Returns the order ID if its status still has to be moved to 'In Work', else None.
+        """
+        # IDs are kept as ints: smaller than strings and cheaper to hash
+        order_id = int(order.get("id"))
         if order_id in self.processed_orders:
             return
 
@@ -310,50 +534,13 @@ class OrderProcessor:
         client_last_name = order.get("client_last_name", "")
         client_name = f"{client_first_name} {client_last_name}".strip()
         
-        for item in order.get("products", []):
+        items = order.get("products", [])
+        # Fetch every item's product (and parent, if needed) concurrently
+        fetched = await asyncio.gather(*[self._fetch_item_note(client, item) for item in items])
+
+        prepared = []
+        for item, (product_data, private_note) in zip(items, fetched):
             product_id = item.get("id")
-            
-            # Fetch product to get private note using the SAME client that found the order
-            product_data = client.get_product(product_id)
-            private_note = ""
-            if product_data:
-                private_note = product_data.get("private_note") or product_data.get("personal_notes") or ""
-                
-                # If no note, check if it's a variation and try fetching parent
-                if not private_note and product_data.get("variation_base_id"):
-                    parent_id = product_data.get("variation_base_id")
-                    logger.info(f"Checking parent product {parent_id} for note...")
-                    parent_data = client.get_product(parent_id)
-                    if parent_data:
-                        private_note = parent_data.get("private_note") or parent_data.get("personal_notes") or ""
-                        if private_note:
-                            logger.info(f"Found note in parent product: {private_note}")
-
-                # Fallback: Check local Excel notes by SKU
-                if not private_note:
-                    sku = item.get("sku")
-                    if sku:
-                        logger.info(f"Checking local notes for SKU {sku}...")
-                        private_note = self.local_notes.get(sku, "")
-                        
-                        # Fuzzy match: Try to find sibling variations if exact match fails
-                        # e.g. if we have MIN-123-4 but DB only has MIN-123-1, they share the same supplier info
-                        if not private_note and "-" in sku:
-                            base_sku = sku.rsplit("-", 1)[0] # "MIN-123-4" -> "MIN-123"
-                            logger.info(f"Direct match failed. Trying fuzzy match for base SKU: {base_sku}...")
-                            
-                            # Scan keys for partial match
-                            for db_sku, db_note in self.local_notes.items():
-                                if db_sku.startswith(base_sku):
-                                    private_note = db_note
-                                    logger.info(f"Fuzzy match success! Found similar SKU {db_sku}")
-                                    break
-
-                        if private_note:
-                            logger.info(f"Found note in local fallback: {private_note}")
-                        else:
-                            logger.warning(f"SKU {sku} not found in local DB (loaded {len(self.local_notes)} items).")
-            
             logger.info(f"Product {product_id} private note: '{private_note}'")
             note_data = self._parse_private_note(private_note)
             
@@ -388,46 +575,68 @@ class OrderProcessor:
                     # Prom API 'url' is usually the main image
                     image_url = images[0].get("url")
 
-            # Send to Telegram
-            try:
-                sent_photo = False
-                if image_url:
-                    try:
-                        await self.bot.send_photo(chat_id=TELEGRAM_CHAT_ID, photo=image_url, caption=message)
-                        logger.info(f"Sent notification with photo for order {order_id}, item {product_id}")
-                        sent_photo = True
-                    except Exception as e_photo:
-                        logger.warning(f"Failed to send photo for order {order_id}: {e_photo}. Falling back to text.")
-                
-                if not sent_photo:
-                        await self.bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-                        logger.info(f"Sent text notification for order {order_id}, item {product_id}")
+            prepared.append((product_id, message, image_url))
 
-            except Exception as e:
-                logger.error(f"Failed to send Telegram message: {e}")
-        
-        # After sending notification, set status to 'custom-133340' (In Work)
-        # Only if it's not already in that status
-        current_status = order.get("status")
-        target_status = "custom-133340"
+        # Send the item notifications in order, one order at a time, so each order's
+        # messages arrive in the chat together and as listed
+        async with self._send_lock:
+            for notification in prepared:
+                await self._send_notification(order_id, *notification)
         
-        if current_status != target_status:
-            if client.set_order_status(order_id, target_status):
-                logger.info(f"Automatically updated order {order_id} status to '{target_status}'")
-            else:
-                logger.error(f"Failed to update status for order {order_id}")
-        else:
-            logger.info(f"Order {order_id} is already in status '{target_status}', skipping update.")
-
         self._save_processed_order(order_id)
 
+        # After sending notification, status goes to 'custom-133340' (In Work),
+        # batched by process_orders. Only if it's not already in that status
+        if order.get("status") == IN_WORK_STATUS:
+            logger.info(f"Order {order_id} is already in status '{IN_WORK_STATUS}', skipping update.")
+            return None
+        return order_id
+
+    def _merge_notes_file(self, temp_path, notes):
+        """
+        Merge an uploaded notes file into a copy of `notes` and save it as the main DB.
+        Blocking; runs in a worker thread. Returns (new_data, merged_data).
+        """
+        with open(temp_path, "rb") as f:
+            new_data = orjson.loads(f.read())
+        
+        # Load existing data
+        current_data = notes.copy()
+        
+        # Merge: update existing keys, add new ones
+        current_data.update(new_data)
+        
+        # Save merged data back to the main file
+        json_path = self._get_json_db_path()
+        # Ensure dir exists
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        
+        # Write next to the target and swap atomically, so readers never see a half-written file
+        tmp_path = json_path + ".part"
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(current_data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, json_path)
+        
+        # Cleanup temp file
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        
+        return new_data, current_data
+
     async def check_telegram_updates(self):
         """
         Check for new files (prom_import_data.json) sent to the bot/chat
         and update local_notes if found.
         """
         try:
-            updates = await self.bot.get_updates(offset=self.last_update_id + 1, timeout=5)
+            # Long poll: the call returns as soon as an update arrives, or empty after TELEGRAM_POLL_TIMEOUT.
+            # Telegram stores allowed_updates server-side for all later getUpdates calls,
+            # so keep my_chat_member for get_chat_id.py even though this loop ignores it.
+            updates = await self.bot.get_updates(
+                offset=self.last_update_id + 1,
+                timeout=TELEGRAM_POLL_TIMEOUT,
+                allowed_updates=["message", "channel_post", "my_chat_member"]
+            )
             for update in updates:
                 self.last_update_id = update.update_id
                 
@@ -460,30 +669,14 @@ class OrderProcessor:
                         
                         # Load new data
                         try:
-                            with open(temp_path, "r", encoding="utf-8") as f:
-                                new_data = json.load(f)
-                            
-                            # Load existing data
-                            current_data = self.local_notes.copy()
-                            
-                            # Merge: update existing keys, add new ones
-                            current_data.update(new_data)
-                            
-                            # Save merged data back to the main file
-                            json_path = self._get_json_db_path()
-                            # Ensure dir exists
-                            os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
-                            
-                            with open(json_path, "w", encoding="utf-8") as f:
-                                json.dump(current_data, f, ensure_ascii=False, indent=2)
+                            # Parsing and rewriting the DB is blocking disk work, keep it off the loop
+                            new_data, current_data = await asyncio.to_thread(
+                                self._merge_notes_file, temp_path, self.local_notes
+                            )
                                 
                             # Update memory
                             self.local_notes = current_data
                             
-                            # Cleanup temp file
-                            if os.path.exists(temp_path):
-                                os.remove(temp_path)
-                            
                             # Confirm receipt
                             chat_id = msg.chat_id
                             await self.bot.send_message(
@@ -499,8 +692,20 @@ class OrderProcessor:
         except Exception as e:
             # Don't crash on Telegram network errors
             logger.error(f"Error checking Telegram updates: {e}")
+            # Back off so a fast-failing call doesn't spin the polling task
+            await asyncio.sleep(5)
 
     async def run(self):
+        async with self.http:
+            await self._run()
+
+    async def _run(self):
+        # Initialize: mark all currently valid orders as processed to avoid spamming old ones
+        # Only do this if we have no history (first run)
+        if not self.processed_orders:
+            logger.info("First run detected. Marking existing orders as processed to avoid spam.")
+            await self._mark_current_orders_processed()
+
         # Send startup notification
         try:
             me = await self.bot.get_me()
@@ -512,11 +717,35 @@ class OrderProcessor:
         except Exception as e:
             logger.error(f"Failed to send startup message: {e}")
 
+        # Independent workers, each on its own cadence, so a slow call in one never delays the others
+        tasks = [
+            asyncio.create_task(self._telegram_loop()),
+            asyncio.create_task(self._orders_loop()),
+            asyncio.create_task(self._accept_loop()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _telegram_loop(self):
+        # No sleep needed: get_updates long-polls and blocks until there is something to do
+        while True:
+            await self.check_telegram_updates()
+
+    async def _accept_loop(self):
         while True:
             try:
-                # Parallel check is risky without async safety, but sequential is fine
-                await self.check_telegram_updates()
                 await self.auto_accept_new_orders()
+            except Exception as e:
+                logger.error(f"Error in auto-accept loop: {e}")
+            
+            await asyncio.sleep(ACCEPT_INTERVAL)
+
+    async def _orders_loop(self):
+        while True:
+            try:
                 await self.process_orders()
                 
                 # Disable startup mode after first full cycle
@@ -525,12 +754,9 @@ class OrderProcessor:
                     logger.info("Startup phase complete. Normal monitoring active.")
 
             except Exception as e:
-                logger.error(f"Error in main loop: {e}")
+                logger.error(f"Error in orders loop: {e}")
             
-            # Reduce sleep interval since we are polling now
-            # Telegram long polling (timeout=5 in get_updates) acts as the sleep
-            # But we still need a small sleep to prevent CPU spin if polling fails fast
-            await asyncio.sleep(5)
+            await asyncio.sleep(CHECK_INTERVAL)
 
 if __name__ == "__main__":
     # Start Web Server in a separate thread (for Render)
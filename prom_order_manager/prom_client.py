@@ -1,64 +1,116 @@
-import requests
+import hashlib
+import httpx
 import logging
-from config import PROM_API_HOST
+import time
+from collections import OrderedDict
+from config import PROM_API_HOST, PROM_AUTH_HEADERS
+
+PRODUCT_CACHE_SIZE = 2048
+PRODUCT_CACHE_TTL = 600  # seconds; keeps private notes reasonably fresh
 
 class PromClient:
-    def __init__(self, token):
+    def __init__(self, token, session):
+        """
+        :param session: shared httpx.AsyncClient (one connection pool for all shops)
+        """
         self.headers = {
-            "Authorization": f"Bearer {token}",
+            **PROM_AUTH_HEADERS[token],
             "Content-Type": "application/json"
         }
         self.host = PROM_API_HOST
+        self.session = session
+        # product_id -> (product, expires_at), least recently used first
+        self._product_cache = OrderedDict()
+        # status -> ETag / body digest of the last order list seen with changed_only=True
+        self._etag_by_status = {}
+        self._digest_by_status = {}
 
-    def get_orders(self, status=None):
+    async def get_orders(self, status=None, changed_only=False):
         """
         Fetch orders from Prom.ua.
         :param status: Filter by status (e.g., 'received', 'processing', 'shipped')
+        :param changed_only: Return None if the list is the same as on the previous
+            changed_only call (If-None-Match / ETag, or a body digest if the API sends no ETag)
         :return: List of orders
         """
         url = f"{self.host}/orders/list"
         params = {}
         if status:
             params["status"] = status
+
+        headers = self.headers
+        etag = self._etag_by_status.get(status) if changed_only else None
+        if etag:
+            headers = {**self.headers, "If-None-Match": etag}
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = await self.session.get(url, headers=headers, params=params)
+            if changed_only and response.status_code == 304:
+                return None
             response.raise_for_status()
+            if changed_only and self._is_unchanged(status, response):
+                return None
             data = response.json()
             return data.get("orders", [])
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, ValueError) as e:
             logging.error(f"Error fetching orders: {e}")
             return []
 
-    def get_order_details(self, order_id):
+    def _is_unchanged(self, status, response):
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etag_by_status[status] = etag
+            return False
+        digest = hashlib.blake2b(response.content, digest_size=16).digest()
+        if self._digest_by_status.get(status) == digest:
+            return True
+        self._digest_by_status[status] = digest
+        return False
+
+    def reset_orders_state(self):
+        """
+        Forget remembered ETags/digests so the next changed_only call returns the full list.
+        """
+        self._etag_by_status.clear()
+        self._digest_by_status.clear()
+
+    async def get_order_details(self, order_id):
         """
         Fetch full details for a specific order.
         """
         url = f"{self.host}/orders/{order_id}"
         try:
-            response = requests.get(url, headers=self.headers)
+            response = await self.session.get(url, headers=self.headers)
             response.raise_for_status()
             data = response.json()
             return data.get("order", {})
-        except requests.exceptions.RequestException as e:
+        except (httpx.HTTPError, ValueError) as e:
             logging.error(f"Error fetching order {order_id}: {e}")
             return None
 
-    def set_order_status(self, order_id, status):
+    async def set_order_status(self, order_id, status):
         """
-        Update order status using batch endpoint.
+        Update status of a single order.
         :param status: 'pending', 'received', 'delivered', 'canceled', 'draft', 'paid'
         """
+        return bool(await self.set_order_status_bulk([order_id], status))
+
+    async def set_order_status_bulk(self, order_ids, status):
+        """
+        Update status of several orders with one call to the batch endpoint.
+        :param status: 'pending', 'received', 'delivered', 'canceled', 'draft', 'paid'
+        :return: List of order IDs whose status was changed (empty on failure)
+        """
         url = f"{self.host}/orders/set_status"
         try:
-            id_int = int(order_id)
+            ids = [int(order_id) for order_id in order_ids]
         except ValueError:
-            logging.error(f"Invalid order_id {order_id}")
-            return False
+            logging.error(f"Invalid order_ids {order_ids}")
+            return []
 
         body = {
             "status": status,
-            "ids": [id_int]
+            "ids": ids
         }
         
         # If status is canceled, we might need a cancellation reason, but for custom status it shouldn't be needed.
@@ -66,38 +118,51 @@ class PromClient:
         # Let's log the full response if it fails.
         
         try:
-            response = requests.post(url, headers=self.headers, json=body)
+            response = await self.session.post(url, headers=self.headers, json=body)
             response.raise_for_status()
             data = response.json()
+            # A batch can partially succeed: processed_ids lists the orders that were moved
+            processed_ids = data.get("processed_ids")
             
             # Check for errors
             if data.get("errors"):
                 logging.error(f"Prom API returned errors: {data['errors']}")
-                return False
+                return processed_ids or []
             
             if data.get("error"):
                 logging.error(f"Prom API returned error: {data['error']}")
-                return False
+                return processed_ids or []
             
             # Check if there are warnings (sometimes it says success but nothing happened)
             if data.get("warnings"):
                  logging.warning(f"Prom API returned warnings: {data['warnings']}")
 
-            return True
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error setting status for order {order_id} to {status}: {e}")
-            return False
+            return ids if processed_ids is None else processed_ids
+        except (httpx.HTTPError, ValueError) as e:
+            logging.error(f"Error setting status for orders {order_ids} to {status}: {e}")
+            return []
 
-    def get_product(self, product_id):
+    async def get_product(self, product_id):
         """
         Fetch product details to get private notes.
+        Results are cached for PRODUCT_CACHE_TTL seconds (parents included).
         """
+        cached = self._product_cache.get(product_id)
+        if cached and cached[1] > time.monotonic():
+            self._product_cache.move_to_end(product_id)
+            return cached[0]
+
         url = f"{self.host}/products/{product_id}"
         try:
-            response = requests.get(url, headers=self.headers)
+            response = await self.session.get(url, headers=self.headers)
             response.raise_for_status()
             data = response.json()
-            return data.get("product", {})
-        except requests.exceptions.RequestException as e:
+            product = data.get("product", {})
+            self._product_cache[product_id] = (product, time.monotonic() + PRODUCT_CACHE_TTL)
+            self._product_cache.move_to_end(product_id)
+            if len(self._product_cache) > PRODUCT_CACHE_SIZE:
+                self._product_cache.popitem(last=False)
+            return product
+        except (httpx.HTTPError, ValueError) as e:
             logging.error(f"Error fetching product {product_id}: {e}")
             return None
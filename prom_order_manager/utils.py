@@ -0,0 +1,16 @@
+# Private note field prefix (lowercase, without ':') -> parsed field name
+NOTE_PREFIXES = {
+    "price": "purchase_price", "цена": "purchase_price",
+    "supplier": "supplier", "поставщик": "supplier",
+    "art": "model", "арт": "model",
+}
+
+# Delivery data keys that may hold the TTN, in priority order
+TTN_KEYS = ("declaration_number", "ttn", "invoice_number")
+
+def extract_note(product):
+    """
+    Return the product's private note ("private_note" or legacy "personal_notes"),
+    or an empty string when it has none.
+    """
+    return product.get("private_note") or product.get("personal_notes") or ""